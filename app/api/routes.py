@@ -1,34 +1,101 @@
-from fastapi import APIRouter, HTTPException
-import uuid
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from functools import lru_cache
+from typing import Optional
+import asyncio
 import logging
+import msgspec
+import re
+from pydantic_core import to_json
 from app.models.api import (
     CreateGraphRequest,
     CreateGraphResponse,
     RunGraphRequest,
+    RunGraphRequestStruct,
     RunGraphResponse,
+    RunGraphBatchRequest,
+    RunGraphBatchResponse,
     StateResponse
 )
-from app.models.graph import Graph, Node, Edge
-from app.storage import get_storage
-from app.core.engine import GraphEngine
+from app.models.graph import Graph
+from app.models.state import WorkflowState
+from app.storage import get_storage, generate_id
+from app.core.engine import GraphEngine, reconstruct_snapshot
+from app.core.tools import get_tool_registry
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+@lru_cache(maxsize=128)
+def _get_engine(graph_id: str) -> GraphEngine:
+    # Engines are reentrant, so one instance per graph serves every run.
+    # Missing graphs raise, which keeps them out of the cache.
+    graph = get_storage().get_graph(graph_id)
+    
+    if not graph:
+        raise HTTPException(status_code=404, detail=f"Graph '{graph_id}' not found")
+    
+    return GraphEngine(graph)
+
+
+_run_request_decoder = msgspec.json.Decoder(RunGraphRequestStruct)
+
+# Run bodies are decoded with msgspec, so document the schema explicitly
+_RUN_REQUEST_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": RunGraphRequest.model_json_schema()}}
+    }
+}
+
+
+def _validation_error(message: str) -> dict:
+    # msgspec reports where a value failed as "... - at `$.field[0]`"; turn that
+    # into a pydantic-style error entry
+    msg, _, path = message.partition(" - at `$")
+    loc = ["body"]
+    for key, index in re.findall(r"\.([^.\[`]+)|\[(\d+)\]", path):
+        loc.append(key if key else int(index))
+    
+    missing = re.match(r"Object missing required field `(.+)`$", msg)
+    if missing:
+        return {"type": "missing", "loc": tuple(loc + [missing.group(1)]), "msg": "Field required", "input": None}
+    return {"type": "value_error", "loc": tuple(loc), "msg": msg, "input": None}
+
+
+def _decode_run_request(raw: bytes) -> RunGraphRequestStruct:
+    # Errors are raised in FastAPI's own 422 shape, matching the pydantic-parsed endpoints
+    try:
+        return _run_request_decoder.decode(raw)
+    except msgspec.ValidationError as e:
+        raise RequestValidationError([_validation_error(str(e))])
+    except msgspec.DecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body",),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": str(e)}
+        }])
+
+
 @router.post("/graph/create", response_model=CreateGraphResponse)
 async def create_graph(request: CreateGraphRequest):
     try:
-        # Convert request to Graph model
-        nodes = [Node(**node_data) for node_data in request.nodes]
-        edges = [Edge(**edge_data) for edge_data in request.edges]
+        # Resolve each node's tool now so missing tools fail at creation
+        tool_registry = get_tool_registry()
+        for node in request.nodes:
+            node._tool = tool_registry.get(node.function_name)
         
+        # Nodes and edges were already parsed with the request body
         graph = Graph(
             name=request.name,
             description=request.description,
-            nodes=nodes,
-            edges=edges,
+            nodes=request.nodes,
+            edges=request.edges,
             start_node=request.start_node
         )
         
@@ -36,7 +103,7 @@ async def create_graph(request: CreateGraphRequest):
         storage = get_storage()
         graph_id = storage.save_graph(graph)
         
-        logger.info(f"Created graph: {graph_id} - {graph.name}")
+        logger.info("Created graph: %s - %s", graph_id, graph.name)
         
         return CreateGraphResponse(
             graph_id=graph_id,
@@ -44,26 +111,24 @@ async def create_graph(request: CreateGraphRequest):
         )
     
     except Exception as e:
-        logger.error(f"Error creating graph: {e}", exc_info=True)
+        logger.error("Error creating graph: %s", e, exc_info=True)
         raise HTTPException(status_code=400, detail=f"Error creating graph: {str(e)}")
 
 
-@router.post("/graph/run", response_model=RunGraphResponse)
-async def run_graph(request: RunGraphRequest):
+@router.post("/graph/run", response_model=RunGraphResponse, openapi_extra=_RUN_REQUEST_OPENAPI)
+async def run_graph(http_request: Request):
+    request = _decode_run_request(await http_request.body())
+    
     try:
-        # Get graph from storage
+        # Reuse the cached engine for this graph
         storage = get_storage()
-        graph = storage.get_graph(request.graph_id)
-        
-        if not graph:
-            raise HTTPException(status_code=404, detail=f"Graph '{request.graph_id}' not found")
+        engine = _get_engine(request.graph_id)
         
-        # Create engine and execute
-        engine = GraphEngine(graph)
-        final_state, execution_log = engine.execute(request.initial_state)
+        # Execute off the event loop; tools are synchronous
+        final_state, execution_log = await asyncio.to_thread(engine.execute, request.initial_state)
         
         # Generate run ID
-        run_id = str(uuid.uuid4())
+        run_id = generate_id()
         
         # Save run
         storage.save_run(
@@ -74,25 +139,131 @@ async def run_graph(request: RunGraphRequest):
             status="completed"
         )
         
-        logger.info(f"Executed graph {request.graph_id}, run ID: {run_id}")
+        logger.info("Executed graph %s, run ID: %s", request.graph_id, run_id)
         
         return RunGraphResponse(
             run_id=run_id,
             graph_id=request.graph_id,
             final_state=final_state.to_dict(),
-            execution_log=execution_log,
+            execution_log=[row.to_model() for row in execution_log],
             status="completed"
         )
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error running graph: {e}", exc_info=True)
+        logger.error("Error running graph: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error running graph: {str(e)}")
 
 
+@router.post("/graph/run_stream", openapi_extra=_RUN_REQUEST_OPENAPI)
+async def run_graph_stream(http_request: Request):
+    request = _decode_run_request(await http_request.body())
+    storage = get_storage()
+    engine = _get_engine(request.graph_id)
+    run_id = generate_id()
+    
+    def stream():
+        # Sync generator; Starlette iterates it in a worker thread
+        final_state = WorkflowState.model_construct(data=dict(request.initial_state), metadata={})
+        execution_log = []
+        status = "completed"
+        detail = None
+        
+        try:
+            for row, final_state in engine.iter_execute(final_state, execution_log):
+                yield row.to_model().model_dump_json() + "\n"
+        except Exception as e:
+            # The 200 response has already started, so report the failure in-band
+            logger.error("Error running graph %s (streamed): %s", request.graph_id, e, exc_info=True)
+            status = "error"
+            detail = f"Error running graph: {str(e)}"
+        
+        # Last line summarises the run, mirroring RunGraphResponse without the log.
+        # Encoded with pydantic's serializer, like the step lines above.
+        summary = {
+            "run_id": run_id,
+            "graph_id": request.graph_id,
+            "final_state": final_state.to_dict(),
+            "status": status
+        }
+        if detail is not None:
+            summary["detail"] = detail
+        try:
+            summary_line = to_json(summary)
+        except Exception as e:
+            logger.error("Error serializing streamed run %s: %s", run_id, e, exc_info=True)
+            status = "error"
+            summary_line = to_json({
+                "run_id": run_id,
+                "graph_id": request.graph_id,
+                "status": status,
+                "detail": f"Error serializing final state: {str(e)}"
+            })
+        
+        storage.save_run(
+            run_id=run_id,
+            graph_id=request.graph_id,
+            state=final_state,
+            execution_log=execution_log,
+            status=status
+        )
+        
+        logger.info("Executed graph %s (streamed), run ID: %s, status: %s", request.graph_id, run_id, status)
+        
+        yield summary_line + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/graph/run_batch", response_model=RunGraphBatchResponse)
+async def run_graph_batch(request: RunGraphBatchRequest):
+    try:
+        # One engine serves the whole batch
+        storage = get_storage()
+        engine = _get_engine(request.graph_id)
+        
+        results = await asyncio.gather(*[
+            asyncio.to_thread(engine.execute, initial_state)
+            for initial_state in request.initial_states
+        ])
+        
+        run_ids = [generate_id() for _ in results]
+        
+        # Save all runs with one storage write
+        storage.save_runs(
+            request.graph_id,
+            [
+                (run_id, final_state, execution_log, "completed")
+                for run_id, (final_state, execution_log) in zip(run_ids, results)
+            ]
+        )
+        
+        logger.info("Executed graph %s for a batch of %d runs", request.graph_id, len(run_ids))
+        
+        return RunGraphBatchResponse(
+            graph_id=request.graph_id,
+            runs=[
+                RunGraphResponse(
+                    run_id=run_id,
+                    graph_id=request.graph_id,
+                    final_state=final_state.to_dict(),
+                    execution_log=[row.to_model() for row in execution_log],
+                    status="completed"
+                )
+                for run_id, (final_state, execution_log) in zip(run_ids, results)
+            ]
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error running graph batch: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error running graph batch: {str(e)}")
+
+
 @router.get("/graph/state/{run_id}", response_model=StateResponse)
-async def get_state(run_id: str):
+async def get_state(run_id: str, step: Optional[int] = None):
     try:
         storage = get_storage()
         run = storage.get_run(run_id)
@@ -100,21 +271,47 @@ async def get_state(run_id: str):
         if not run:
             raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
         
+        if step is None:
+            # Serve the full state from the cached body after the first poll
+            cached = storage.get_run_json(run_id)
+            if cached is None:
+                cached = StateResponse(
+                    run_id=run_id,
+                    graph_id=run["graph_id"],
+                    current_state=run["state"].to_dict(),
+                    status=run["status"],
+                    execution_log=[row.to_model() for row in run["execution_log"]]
+                ).model_dump_json().encode()
+                storage.save_run_json(run_id, cached)
+            return Response(content=cached, media_type="application/json")
+        
+        # Rebuild the state as of an earlier step from the delta log
         return StateResponse(
             run_id=run_id,
             graph_id=run["graph_id"],
-            current_state=run["state"].to_dict(),
+            current_state=reconstruct_snapshot(run["execution_log"], step),
             status=run["status"],
-            execution_log=run["execution_log"]
+            execution_log=[row.to_model() for row in run["execution_log"]]
         )
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting state: {e}", exc_info=True)
+        logger.error("Error getting state: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error getting state: {str(e)}")
 
 
+@router.get("/graph/{graph_id}", response_model=Graph)
+async def get_graph(graph_id: str):
+    storage = get_storage()
+    cached = storage.get_graph_json(graph_id)
+    
+    if cached is None:
+        raise HTTPException(status_code=404, detail=f"Graph '{graph_id}' not found")
+    
+    return Response(content=cached, media_type="application/json")
+
+
 @router.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "Agent Workflow Engine"}
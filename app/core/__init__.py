@@ -1,9 +1,11 @@
 from app.core.tools import ToolRegistry, register_tool, get_tool_registry
-from app.core.engine import GraphEngine
+from app.core.engine import GraphEngine, ExecutionLogRow, reconstruct_snapshot
 
 __all__ = [
     "ToolRegistry",
     "register_tool",
     "get_tool_registry",
-    "GraphEngine"
+    "GraphEngine",
+    "ExecutionLogRow",
+    "reconstruct_snapshot"
 ]
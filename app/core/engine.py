@@ -1,69 +1,166 @@
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+import copy
+from typing import Any, Dict, Iterator, List, Optional
 import logging
 from app.models.state import WorkflowState
-from app.models.graph import Graph, Node, ConditionalEdge
+from app.models.graph import Graph, Node, ConditionalEdge, OPERATORS
 from app.models.api import ExecutionLog
 from app.core.tools import get_tool_registry
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+
+@dataclass
+class ExecutionLogRow:
+    # Lightweight log entry built on the hot path; converted to the
+    # ExecutionLog API model only when a response is produced.
+    __slots__ = ("step", "node", "status", "message", "state_snapshot")
+    
+    step: int
+    node: str
+    status: str
+    message: str
+    state_snapshot: Dict[str, Any]
+    
+    def to_model(self) -> ExecutionLog:
+        return ExecutionLog.model_construct(
+            step=self.step,
+            node=self.node,
+            status=self.status,
+            message=self.message,
+            state_snapshot=self.state_snapshot
+        )
+
+
+def _copy_value(value: Any) -> Any:
+    # Log entries hold copies so later in-place changes cannot rewrite history;
+    # values that cannot be copied are logged by reference
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return value
+
+
+def _logged_copy(state: WorkflowState) -> Dict[str, Any]:
+    # A run's copy of the state as last written to its log
+    return {"data": {key: _copy_value(value) for key, value in state.data.items()},
+            "metadata": _copy_value(state.metadata)}
+
+
+def _diff_state(logged: Dict[str, Any], state: WorkflowState) -> Dict[str, Any]:
+    # Values are compared by equality against the logged copy, so in-place
+    # mutations are detected too; the identity check first keeps unchanged
+    # immutable values (e.g. code) cheap. `logged` is advanced to match.
+    logged_data = logged["data"]
+    data = state.data
+    delta = {
+        key: _copy_value(value) for key, value in data.items()
+        if (previous := logged_data.get(key, _MISSING)) is not value and previous != value
+    }
+    changes: Dict[str, Any] = {"delta": delta}
+    logged_data.update(delta)
+    
+    removed = [key for key in logged_data if key not in data]
+    if removed:
+        changes["removed"] = removed
+        for key in removed:
+            del logged_data[key]
+    
+    if logged["metadata"] != state.metadata:
+        logged["metadata"] = changes["metadata"] = _copy_value(state.metadata)
+    
+    return changes
+
+
+def reconstruct_snapshot(execution_log: List[ExecutionLogRow], step: int) -> Dict[str, Any]:
+    # Replay the initial state and per-step deltas up to (and including) `step`;
+    # metadata is logged in full whenever it changes
+    data: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {}
+    for entry in execution_log:
+        snapshot = entry.state_snapshot or {}
+        data.update(snapshot.get("base", {}))
+        metadata = snapshot.get("base_metadata", metadata)
+        if entry.step > step:
+            break
+        data.update(snapshot.get("delta", {}))
+        for key in snapshot.get("removed", []):
+            data.pop(key, None)
+        metadata = snapshot.get("metadata", metadata)
+    return {"data": data, "metadata": metadata}
+
 
 class GraphEngine:
+    # Holds only the graph and configuration; all per-run state lives in
+    # execute(), so one engine can serve concurrent runs of the same graph.
     def __init__(self, graph: Graph):
         self.graph = graph
         self.tool_registry = get_tool_registry()
-        self.execution_log: List[ExecutionLog] = []
-        self.step_counter = 0
         self.max_iterations = 100  # Prevent infinite loops
     
-    def execute(self, initial_state: Dict[str, Any]) -> tuple[WorkflowState, List[ExecutionLog]]:
-        state = WorkflowState(data=initial_state)
-        self.execution_log = []
-        self.step_counter = 0
+    def execute(self, initial_state: Dict[str, Any]) -> tuple[WorkflowState, List[ExecutionLogRow]]:
+        # initial_state was validated with the request; skip re-validating it
+        state = WorkflowState.model_construct(data=dict(initial_state), metadata={})
+        execution_log: List[ExecutionLogRow] = []
+        
+        for _, state in self.iter_execute(state, execution_log):
+            pass
         
+        return state, execution_log
+    
+    def iter_execute(self, state: WorkflowState,
+                     execution_log: List[ExecutionLogRow]) -> Iterator[tuple[ExecutionLogRow, WorkflowState]]:
+        # Yields each log row as soon as its step finishes, with the state after it
         current_node_name = self.graph.start_node
-        visited_nodes = []
+        # Copy of the state as of the last log entry, used to diff each step
+        logged = _logged_copy(state)
+        
+        logger.info("Starting graph execution: %s", self.graph.name)
         
-        logger.info(f"Starting graph execution: {self.graph.name}")
+        linear_plan = self.graph.linear_plan
+        if linear_plan is not None and len(linear_plan) <= self.max_iterations:
+            # No branching possible: run the precomputed node sequence directly
+            for node in linear_plan:
+                state, ok = self._run_step(node, state, execution_log, logged)
+                yield execution_log[-1], state
+                if not ok:
+                    break
+            
+            logger.info("Graph execution completed. Total steps: %d", len(execution_log))
+            return
         
         while current_node_name and current_node_name != "END":
-            if self.step_counter >= self.max_iterations:
+            if len(execution_log) >= self.max_iterations:
                 self._log_step(
+                    execution_log,
+                    logged,
                     current_node_name,
                     "error",
                     f"Maximum iterations ({self.max_iterations}) reached. Possible infinite loop.",
                     state
                 )
+                yield execution_log[-1], state
                 break
             
             # Get the node
             node = self.graph.get_node(current_node_name)
             if not node:
                 self._log_step(
+                    execution_log,
+                    logged,
                     current_node_name,
                     "error",
                     f"Node '{current_node_name}' not found in graph",
                     state
                 )
+                yield execution_log[-1], state
                 break
             
-            # Execute the node
-            try:
-                state = self._execute_node(node, state)
-                self._log_step(
-                    current_node_name,
-                    "success",
-                    f"Node '{current_node_name}' executed successfully",
-                    state
-                )
-            except Exception as e:
-                self._log_step(
-                    current_node_name,
-                    "error",
-                    f"Error executing node '{current_node_name}': {str(e)}",
-                    state
-                )
-                logger.error(f"Error in node {current_node_name}: {e}", exc_info=True)
+            state, ok = self._run_step(node, state, execution_log, logged)
+            yield execution_log[-1], state
+            if not ok:
                 break
             
             # Get next node
@@ -81,18 +178,44 @@ class GraphEngine:
             else:
                 # ConditionalEdge object
                 current_node_name = self._evaluate_conditional_edge(next_node, state)
-            
-            visited_nodes.append(current_node_name)
         
-        logger.info(f"Graph execution completed. Total steps: {self.step_counter}")
-        return state, self.execution_log
+        logger.info("Graph execution completed. Total steps: %d", len(execution_log))
+    
+    def _run_step(self, node: Node, state: WorkflowState, execution_log: List[ExecutionLogRow],
+                  logged: Dict[str, Any]) -> tuple[WorkflowState, bool]:
+        # Execute the node, logging only the keys it changed
+        try:
+            state = self._execute_node(node, state)
+            self._log_step(
+                execution_log,
+                logged,
+                node.name,
+                "success",
+                f"Node '{node.name}' executed successfully",
+                state
+            )
+            return state, True
+        except Exception as e:
+            self._log_step(
+                execution_log,
+                logged,
+                node.name,
+                "error",
+                f"Error executing node '{node.name}': {str(e)}",
+                state
+            )
+            # Tracebacks are only worth walking when debugging
+            logger.error("Error in node %s: %s", node.name, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            return state, False
     
     def _execute_node(self, node: Node, state: WorkflowState) -> WorkflowState:
-        # Get the tool function
-        if not self.tool_registry.has(node.function_name):
-            raise ValueError(f"Function '{node.function_name}' not found in tool registry")
-        
-        tool_func = self.tool_registry.get(node.function_name)
+        # Use the tool bound at graph creation, falling back to the registry
+        tool_func = getattr(node, "_tool", None)
+        if tool_func is None:
+            if not self.tool_registry.has(node.function_name):
+                raise ValueError(f"Function '{node.function_name}' not found in tool registry")
+            
+            tool_func = self.tool_registry.get(node.function_name)
         
         # Execute the function with the state
         result = tool_func(state)
@@ -119,43 +242,43 @@ class GraphEngine:
         result = self._compare_values(state_value, operator, condition_value)
         
         next_node = true_node if result else false_node
-        logger.info(f"Condition: {state_value} {operator} {condition_value} = {result}, next: {next_node}")
+        logger.info("Condition: %s %s %s = %s, next: %s", state_value, operator, condition_value, result, next_node)
         
         return next_node
     
     def _evaluate_conditional_edge(self, edge: ConditionalEdge, state: WorkflowState) -> str:
         state_value = state.get(edge.condition_key)
         
-        result = self._compare_values(state_value, edge.condition_operator, edge.condition_value)
+        # Comparator is resolved once when the edge is built
+        result = edge._op(state_value, edge.condition_value)
         
         next_node = edge.true_node if result else edge.false_node
-        logger.info(f"Condition: {state_value} {edge.condition_operator} {edge.condition_value} = {result}, next: {next_node}")
+        logger.info(
+            "Condition: %s %s %s = %s, next: %s",
+            state_value, edge.condition_operator, edge.condition_value, result, next_node
+        )
         
         return next_node
     
     def _compare_values(self, left: Any, operator: str, right: Any) -> bool:
-        if operator == "<":
-            return left < right
-        elif operator == ">":
-            return left > right
-        elif operator == "<=":
-            return left <= right
-        elif operator == ">=":
-            return left >= right
-        elif operator == "==":
-            return left == right
-        elif operator == "!=":
-            return left != right
-        else:
+        compare = OPERATORS.get(operator)
+        if compare is None:
             raise ValueError(f"Unknown operator: {operator}")
+        return compare(left, right)
     
-    def _log_step(self, node: str, status: str, message: str, state: WorkflowState) -> None:
-        self.step_counter += 1
-        log_entry = ExecutionLog(
-            step=self.step_counter,
+    def _log_step(self, execution_log: List[ExecutionLogRow], logged: Dict[str, Any], node: str,
+                  status: str, message: str, state: WorkflowState) -> None:
+        changes: Dict[str, Any] = {}
+        if not execution_log:
+            # The first entry carries the initial state; later entries are deltas
+            changes["base"] = dict(logged["data"])
+            changes["base_metadata"] = logged["metadata"]
+        changes.update(_diff_state(logged, state))
+        log_entry = ExecutionLogRow(
+            step=len(execution_log) + 1,
             node=node,
             status=status,
             message=message,
-            state_snapshot=state.to_dict()
+            state_snapshot=changes
         )
-        self.execution_log.append(log_entry)
+        execution_log.append(log_entry)
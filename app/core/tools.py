@@ -10,7 +10,7 @@ class ToolRegistry:
     
     def register(self, name: str, func: Callable) -> None:
         self._tools[name] = func
-        logger.info(f"Registered tool: {name}")
+        logger.info("Registered tool: %s", name)
     
     def get(self, name: str) -> Callable:
         if name not in self._tools:
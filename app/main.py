@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
@@ -18,7 +19,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Agent Workflow Engine",
     description="A minimal workflow/graph engine for executing agent workflows with nodes, edges, and state management",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
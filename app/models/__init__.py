@@ -4,7 +4,10 @@ from app.models.api import (
     CreateGraphRequest,
     CreateGraphResponse,
     RunGraphRequest,
+    RunGraphRequestStruct,
     RunGraphResponse,
+    RunGraphBatchRequest,
+    RunGraphBatchResponse,
     StateResponse,
     ExecutionLog
 )
@@ -18,7 +21,10 @@ __all__ = [
     "CreateGraphRequest",
     "CreateGraphResponse",
     "RunGraphRequest",
+    "RunGraphRequestStruct",
     "RunGraphResponse",
+    "RunGraphBatchRequest",
+    "RunGraphBatchResponse",
     "StateResponse",
     "ExecutionLog"
 ]
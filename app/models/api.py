@@ -1,13 +1,14 @@
 from typing import Any, Dict, List, Optional
+import msgspec
 from pydantic import BaseModel, Field
-from app.models.graph import Graph
+from app.models.graph import Graph, Node, Edge
 
 
 class CreateGraphRequest(BaseModel):
     name: str = Field(..., description="Graph name")
     description: Optional[str] = Field(None, description="Graph description")
-    nodes: List[Dict[str, Any]] = Field(..., description="List of node definitions")
-    edges: List[Dict[str, Any]] = Field(..., description="List of edge definitions")
+    nodes: List[Node] = Field(..., description="List of node definitions")
+    edges: List[Edge] = Field(..., description="List of edge definitions")
     start_node: str = Field(..., description="Starting node name")
 
 
@@ -21,12 +22,23 @@ class RunGraphRequest(BaseModel):
     initial_state: Dict[str, Any] = Field(default_factory=dict, description="Initial state data")
 
 
+class RunGraphRequestStruct(msgspec.Struct):
+    # msgspec mirror of RunGraphRequest used to decode /graph/run bodies directly
+    graph_id: str
+    initial_state: Dict[str, Any] = {}
+
+
+class RunGraphBatchRequest(BaseModel):
+    graph_id: str = Field(..., description="Graph identifier to run")
+    initial_states: List[Dict[str, Any]] = Field(..., description="Initial state data, one entry per run")
+
+
 class ExecutionLog(BaseModel):
     step: int = Field(..., description="Step number")
     node: str = Field(..., description="Node name")
     status: str = Field(..., description="Execution status")
     message: Optional[str] = Field(None, description="Log message")
-    state_snapshot: Optional[Dict[str, Any]] = Field(None, description="State after execution")
+    state_snapshot: Optional[Dict[str, Any]] = Field(None, description="Copies of the state keys changed by this step, plus metadata when it changed (first step also carries the initial state)")
 
 
 class RunGraphResponse(BaseModel):
@@ -37,6 +49,11 @@ class RunGraphResponse(BaseModel):
     status: str = Field(..., description="Overall execution status")
 
 
+class RunGraphBatchResponse(BaseModel):
+    graph_id: str = Field(..., description="Graph identifier")
+    runs: List[RunGraphResponse] = Field(..., description="Results in the same order as initial_states")
+
+
 class StateResponse(BaseModel):
     run_id: str = Field(..., description="Run identifier")
     graph_id: str = Field(..., description="Graph identifier")
@@ -1,5 +1,23 @@
 from typing import Any, Callable, Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+import operator
+import sys
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+# Supported condition operators mapped to their comparison functions
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne
+}
+
+
+def _intern_name(value: Any) -> Any:
+    # Node names are used as dict keys on every step; interning lets lookups
+    # match by identity before falling back to string comparison
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class ConditionalEdge(BaseModel):
@@ -8,6 +26,18 @@ class ConditionalEdge(BaseModel):
     condition_value: Any = Field(..., description="Value to compare against")
     true_node: str = Field(..., description="Node to execute if condition is true")
     false_node: str = Field(..., description="Node to execute if condition is false")
+    
+    intern_names = field_validator("true_node", "false_node")(_intern_name)
+    
+    @model_validator(mode="after")
+    def _resolve_operator(self) -> "ConditionalEdge":
+        if self.condition_operator not in OPERATORS:
+            raise ValueError(f"Unknown operator: {self.condition_operator}")
+        # Hot-path caches are plain instance attributes rather than PrivateAttr:
+        # pydantic resolves private attributes through __getattr__, which costs
+        # more per access than the comparison itself
+        self._op: Callable[[Any, Any], bool] = OPERATORS[self.condition_operator]
+        return self
 
 
 class Node(BaseModel):
@@ -17,6 +47,10 @@ class Node(BaseModel):
     
     class Config:
         arbitrary_types_allowed = True
+    
+    # create_graph binds the resolved tool function as `node._tool`, a plain
+    # instance attribute (see ConditionalEdge._op); it is absent otherwise
+    intern_names = field_validator("name")(_intern_name)
 
 
 class Edge(BaseModel):
@@ -25,9 +59,13 @@ class Edge(BaseModel):
     
     class Config:
         arbitrary_types_allowed = True
+    
+    intern_names = field_validator("from_node", "to_node")(_intern_name)
 
 
 class Graph(BaseModel):
+    # Node/edge lookups are indexed once at construction; treat nodes and
+    # edges as immutable after the graph is built (or call rebuild_index()).
     graph_id: Optional[str] = Field(None, description="Unique graph identifier")
     name: str = Field(..., description="Graph name")
     description: Optional[str] = Field(None, description="Graph description")
@@ -38,14 +76,51 @@ class Graph(BaseModel):
     class Config:
         arbitrary_types_allowed = True
     
-    def get_node(self, name: str) -> Optional[Node]:
+    intern_names = field_validator("start_node")(_intern_name)
+    
+    @model_validator(mode="after")
+    def _build_index(self) -> "Graph":
+        self.rebuild_index()
+        return self
+    
+    def rebuild_index(self) -> None:
+        # Stored as plain instance attributes (see ConditionalEdge._op)
+        # First node / edge wins for a repeated name, matching the previous linear scans
+        node_index: Dict[str, Node] = {}
         for node in self.nodes:
-            if node.name == name:
-                return node
-        return None
+            node_index.setdefault(node.name, node)
+        self._node_index: Dict[str, Node] = node_index
+        edge_index: Dict[str, Union[str, ConditionalEdge]] = {}
+        for edge in self.edges:
+            edge_index.setdefault(edge.from_node, edge.to_node)
+        self._edge_index: Dict[str, Union[str, ConditionalEdge]] = edge_index
+        self._linear_plan: Optional[List[Node]] = self._build_linear_plan()
+    
+    def _build_linear_plan(self) -> Optional[List[Node]]:
+        # Walk simple edges from the start node; any conditional edge, cycle
+        # or missing node means the graph needs the general engine loop.
+        plan: List[Node] = []
+        seen = set()
+        current: Optional[Union[str, ConditionalEdge]] = self.start_node
+        
+        while current is not None and current != "END":
+            if not isinstance(current, str) or current in seen:
+                return None
+            node = self._node_index.get(current)
+            if node is None:
+                return None
+            seen.add(current)
+            plan.append(node)
+            current = self._edge_index.get(current)
+        
+        return plan
+    
+    @property
+    def linear_plan(self) -> Optional[List[Node]]:
+        return self._linear_plan
+    
+    def get_node(self, name: str) -> Optional[Node]:
+        return self._node_index.get(name)
     
     def get_next_node(self, current_node: str) -> Optional[Union[str, ConditionalEdge]]:
-        for edge in self.edges:
-            if edge.from_node == current_node:
-                return edge.to_node
-        return None
+        return self._edge_index.get(current_node)
@@ -8,6 +8,7 @@ class WorkflowState(BaseModel):
     
     class Config:
         arbitrary_types_allowed = True
+        validate_assignment = False
     
     def get(self, key: str, default: Any = None) -> Any:
         return self.data.get(key, default)
@@ -18,6 +19,18 @@ class WorkflowState(BaseModel):
     def update(self, updates: Dict[str, Any]) -> None:
         self.data.update(updates)
     
+    @property
+    def scratch(self) -> Dict[str, Any]:
+        # Working values shared between tools (e.g. parsed ASTs, memo keys). Kept
+        # outside `data`, so they are never serialized, logged or diffed. Stored
+        # as a plain instance attribute (see Graph.rebuild_index) and created
+        # lazily, since states are built with model_construct.
+        try:
+            return self._scratch
+        except AttributeError:
+            self._scratch: Dict[str, Any] = {}
+            return self._scratch
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             "data": self.data,
@@ -1,3 +1,3 @@
-from app.storage.memory import InMemoryStorage, get_storage
+from app.storage.memory import InMemoryStorage, get_storage, generate_id
 
-__all__ = ["InMemoryStorage", "get_storage"]
+__all__ = ["InMemoryStorage", "get_storage", "generate_id"]
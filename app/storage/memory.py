@@ -1,50 +1,81 @@
-from typing import Dict, Optional, Any
-import uuid
+from typing import Dict, List, Optional, Any, Tuple
+import os
 from app.models.graph import Graph
 from app.models.state import WorkflowState
 from app.models.api import ExecutionLog
 import threading
 
 
+def generate_id() -> str:
+    # 128 random bits as hex; skips building a uuid.UUID object per ID
+    return os.urandom(16).hex()
+
+
 class InMemoryStorage:
     def __init__(self):
         self._graphs: Dict[str, Graph] = {}
         self._runs: Dict[str, Dict[str, Any]] = {}
+        # Preserialized JSON bodies, reused by read endpoints
+        self._graphs_json: Dict[str, bytes] = {}
+        self._runs_json: Dict[str, bytes] = {}
+        # Only writes take the lock; single dict reads are atomic under the GIL
         self._lock = threading.Lock()
     
     def save_graph(self, graph: Graph) -> str:
         with self._lock:
             if not graph.graph_id:
-                graph.graph_id = str(uuid.uuid4())
+                graph.graph_id = generate_id()
             self._graphs[graph.graph_id] = graph
+            self._graphs_json[graph.graph_id] = graph.model_dump_json().encode()
             return graph.graph_id
     
     def get_graph(self, graph_id: str) -> Optional[Graph]:
-        with self._lock:
-            return self._graphs.get(graph_id)
+        return self._graphs.get(graph_id)
+    
+    def get_graph_json(self, graph_id: str) -> Optional[bytes]:
+        return self._graphs_json.get(graph_id)
     
     def save_run(self, run_id: str, graph_id: str, state: WorkflowState, 
                  execution_log: list, status: str) -> None:
+        record = self._make_run(run_id, graph_id, state, execution_log, status)
         with self._lock:
-            self._runs[run_id] = {
-                "run_id": run_id,
-                "graph_id": graph_id,
-                "state": state,
-                "execution_log": execution_log,
-                "status": status
-            }
+            self._runs[run_id] = record
     
-    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+    def save_runs(self, graph_id: str, runs: List[Tuple[str, WorkflowState, list, str]]) -> None:
+        # Bulk insert of (run_id, state, execution_log, status) under a single lock
+        records = {
+            run_id: self._make_run(run_id, graph_id, state, execution_log, status)
+            for run_id, state, execution_log, status in runs
+        }
         with self._lock:
-            return self._runs.get(run_id)
+            self._runs.update(records)
+    
+    @staticmethod
+    def _make_run(run_id: str, graph_id: str, state: WorkflowState,
+                  execution_log: list, status: str) -> Dict[str, Any]:
+        return {
+            "run_id": run_id,
+            "graph_id": graph_id,
+            "state": state,
+            "execution_log": execution_log,
+            "status": status
+        }
+    
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return self._runs.get(run_id)
+    
+    def get_run_json(self, run_id: str) -> Optional[bytes]:
+        return self._runs_json.get(run_id)
+    
+    def save_run_json(self, run_id: str, content: bytes) -> None:
+        # Runs are immutable once saved, so their serialized state can be reused
+        self._runs_json[run_id] = content
     
     def list_graphs(self) -> list:
-        with self._lock:
-            return list(self._graphs.keys())
+        return list(self._graphs.keys())
     
     def list_runs(self) -> list:
-        with self._lock:
-            return list(self._runs.keys())
+        return list(self._runs.keys())
 
 
 # Global storage instance
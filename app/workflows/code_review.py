@@ -1,160 +1,296 @@
-import re
 import ast
-from typing import Dict, Any
+import sys
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from app.models.state import WorkflowState
 from app.core.tools import register_tool
 
+# Improvement suggestion for each issue type reported by detect_issues
+_SUGGESTION_BY_TYPE = {
+    "long_function": "Consider breaking this function into smaller, more focused functions",
+    "high_complexity": "Reduce complexity by extracting conditional logic into separate functions",
+    "too_many_params": "Consider using a configuration object or dataclass to group related parameters"
+}
+
+
+# Only statement blocks can contain function definitions
+_BLOCK_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+
+class _FunctionCollector(ast.NodeVisitor):
+    def __init__(self):
+        self.functions = []
+    
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        self.functions.append(node)
+        self.generic_visit(node)
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def generic_visit(self, node: ast.AST) -> None:
+        # Recurse into nested statement blocks only, skipping expression subtrees
+        for field in _BLOCK_FIELDS:
+            for child in getattr(node, field, ()):
+                self.visit(child)
+
+
+@lru_cache(maxsize=128)
+def _parse_and_extract(code: str) -> Tuple[Tuple[Tuple[Any, ...], ...], Tuple[int, ...], Optional[str]]:
+    # Shared by every run (and thread) that reviews the same code, so the result
+    # holds only tuples, strings and ints: the AST never leaves this function.
+    # extract_functions builds fresh dicts for each state.
+    try:
+        # Parse the code using AST
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return (), (), str(e)
+    
+    collector = _FunctionCollector()
+    collector.visit(tree)
+    
+    # Get function info as (name, line_start, line_end, args, num_lines); names are
+    # interned so every issue, suggestion and score for a function shares one string
+    func_infos = tuple(
+        (
+            sys.intern(node.name),
+            node.lineno,
+            node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
+            tuple(arg.arg for arg in node.args.args),
+            (node.end_lineno - node.lineno + 1) if hasattr(node, 'end_lineno') else 1
+        )
+        for node in collector.functions
+    )
+    
+    # Base complexity plus one per branch, loop, handler, comprehension
+    # and extra boolean operand
+    complexities = tuple(1 + _count_decision_points(node) for node in collector.functions)
+    
+    return func_infos, complexities, None
+
+
+def _extracted_complexities(state: WorkflowState, code: str, functions: Any) -> Optional[Tuple[int, ...]]:
+    # Complexities extract_functions computed, but only while the state still
+    # holds the exact `functions` list it built from this code; they are
+    # matched to functions by position, so any other list must be re-matched
+    extracted = state.scratch.get("extracted")
+    if extracted is None or extracted[1] is not functions:
+        return None
+    if extracted[0] is not code and extracted[0] != code:
+        return None
+    return extracted[2]
+
 
 @register_tool("extract_functions")
 def extract_functions(state: WorkflowState) -> WorkflowState:
     code = state.get("code", "")
     
-    if not code:
-        state.set("functions", [])
-        state.set("function_count", 0)
+    # Source without the "def" keyword cannot define functions; skip the parser
+    if not code or "def" not in code:
+        functions = []
+        state.update({"functions": functions, "function_count": 0})
+        # Tell check_complexity there is nothing to look up, so it does not re-parse
+        state.scratch["extracted"] = (code, functions, ())
+        return state
+    
+    # Same code with our previous output still in place (e.g. a loop back
+    # through this node) keeps that result
+    if _extracted_complexities(state, code, state.get("functions")) is not None:
         return state
     
-    try:
-        # Parse the code using AST
-        tree = ast.parse(code)
+    func_infos, complexities, parse_error = _parse_and_extract(code)
+    
+    if parse_error is not None:
         functions = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Get function info
-                func_info = {
-                    "name": node.name,
-                    "line_start": node.lineno,
-                    "line_end": node.end_lineno if hasattr(node, 'end_lineno') else node.lineno,
-                    "args": [arg.arg for arg in node.args.args],
-                    "num_lines": (node.end_lineno - node.lineno + 1) if hasattr(node, 'end_lineno') else 1
-                }
-                functions.append(func_info)
-        
-        state.set("functions", functions)
-        state.set("function_count", len(functions))
-        
-    except SyntaxError as e:
-        state.set("functions", [])
-        state.set("function_count", 0)
-        state.set("parse_error", str(e))
+        state.update({
+            "functions": functions,
+            "function_count": 0,
+            "parse_error": parse_error
+        })
+        state.scratch["extracted"] = (code, functions, ())
+        return state
+    
+    functions = [
+        {
+            "name": name,
+            "line_start": line_start,
+            "line_end": line_end,
+            "args": list(args),
+            "num_lines": num_lines
+        }
+        for name, line_start, line_end, args, num_lines in func_infos
+    ]
+    
+    state.update({"functions": functions, "function_count": len(functions)})
+    # Keep the complexities, aligned with this `functions` list and code, so
+    # later tools (and loop-backs) don't re-parse or re-walk the module
+    state.scratch["extracted"] = (code, functions, complexities)
     
     return state
 
 
+# Node types that each add one decision point
+_DECISION_NODES = frozenset({
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.IfExp, ast.comprehension
+})
+
+
+def _walk_nodes(root: ast.AST) -> List[ast.AST]:
+    # Breadth-first flattening like ast.walk, but into a list that is extended
+    # while iterated instead of a deque fed by nested generators
+    nodes = [root]
+    ast_type = ast.AST
+    for node in nodes:
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                nodes.extend([item for item in value if isinstance(item, ast_type)])
+            elif isinstance(value, ast_type):
+                nodes.append(value)
+    return nodes
+
+
+def _count_decision_points(func_node: ast.AST) -> int:
+    nodes = _walk_nodes(func_node)
+    # Tally node types in C, then read off the decision-node counts
+    counts = Counter(map(type, nodes))
+    count = sum(map(counts.__getitem__, _DECISION_NODES))
+    if ast.BoolOp in counts:
+        bool_op = ast.BoolOp
+        count += sum([len(node.values) - 1 for node in nodes if type(node) is bool_op])
+    return count
+
+
+def _complexities_for(code: str, functions: List[Dict[str, Any]]) -> List[int]:
+    # Fallback when functions were supplied or replaced after extract_functions:
+    # match each function to a parsed definition by line_start
+    if not functions:
+        return []
+    
+    func_infos, complexities, _ = _parse_and_extract(code)
+    by_line = {info[1]: complexity for info, complexity in zip(func_infos, complexities)}
+    return [by_line.get(func["line_start"], 1) for func in functions]
+
+
 @register_tool("check_complexity")
 def check_complexity(state: WorkflowState) -> WorkflowState:
     code = state.get("code", "")
     functions = state.get("functions", [])
     
-    complexity_scores = []
+    # The workflow loops back here with the same inputs; only recompute when the
+    # code or the functions list changed, or our previous scores were replaced
+    memo = state.scratch.get("complexity_memo")
+    if (memo is not None and (memo[0] is code or memo[0] == code)
+            and memo[1] is functions and memo[2] is state.get("complexity_scores")):
+        return state
     
-    for func in functions:
-        # Simple complexity: count decision points
-        # In real implementation, use proper cyclomatic complexity
-        func_name = func["name"]
-        
-        # Count if, for, while, and, or, except
-        complexity = 1  # Base complexity
-        
-        # Extract function code (simplified)
-        lines = code.split('\n')
-        func_code = '\n'.join(lines[func["line_start"]-1:func["line_end"]])
-        
-        # Count decision points
-        complexity += func_code.count('if ')
-        complexity += func_code.count('elif ')
-        complexity += func_code.count('for ')
-        complexity += func_code.count('while ')
-        complexity += func_code.count(' and ')
-        complexity += func_code.count(' or ')
-        complexity += func_code.count('except')
-        
-        complexity_scores.append({
-            "function": func_name,
+    complexities = _extracted_complexities(state, code, functions)
+    
+    if complexities is None:
+        # Functions or code changed since extraction; match by line_start instead
+        complexities = _complexities_for(code, functions)
+    
+    complexity_scores = [
+        {
+            "function": func["name"],
             "complexity": complexity,
             "lines": func["num_lines"]
-        })
+        }
+        for func, complexity in zip(functions, complexities)
+    ]
     
-    # Calculate average complexity
-    avg_complexity = sum(s["complexity"] for s in complexity_scores) / len(complexity_scores) if complexity_scores else 0
+    # Calculate average complexity over the flat int list rather than the score dicts
+    avg_complexity = sum(complexities) / len(complexities) if complexities else 0
     
-    state.set("complexity_scores", complexity_scores)
-    state.set("avg_complexity", avg_complexity)
+    state.update({"complexity_scores": complexity_scores, "avg_complexity": avg_complexity})
+    state.scratch["complexity_memo"] = (code, functions, complexity_scores)
     
     return state
 
 
-@register_tool("detect_issues")
-def detect_issues(state: WorkflowState) -> WorkflowState:
-    functions = state.get("functions", [])
-    complexity_scores = state.get("complexity_scores", [])
+def _long_function_issue(func: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "long_function",
+        "function": func["name"],
+        "severity": "medium",
+        "message": f"Function '{func['name']}' is {func['num_lines']} lines long (recommended: < 50)"
+    }
+
+
+def _high_complexity_issue(func: Dict[str, Any], complexity: int) -> Dict[str, Any]:
+    return {
+        "type": "high_complexity",
+        "function": func["name"],
+        "severity": "high",
+        "message": f"Function '{func['name']}' has complexity {complexity} (recommended: < 10)"
+    }
+
+
+def _too_many_params_issue(func: Dict[str, Any], num_args: int) -> Dict[str, Any]:
+    return {
+        "type": "too_many_params",
+        "function": func["name"],
+        "severity": "low",
+        "message": f"Function '{func['name']}' has {num_args} parameters (recommended: < 5)"
+    }
+
+
+def _quality_score(issue_count: int, avg_complexity: float) -> float:
+    # Start with perfect score
+    score = 10.0
+    
+    # Deduct points for issues
+    score -= min(issue_count * 0.5, 5)  # Max 5 points deduction for issues
     
+    # Deduct points for high average complexity
+    if avg_complexity > 10:
+        score -= min((avg_complexity - 10) * 0.3, 3)  # Max 3 points for complexity
+    
+    # Ensure score is between 0 and 10
+    score = max(0, min(10, score))
+    
+    return round(score, 2)
+
+
+def _find_issues(functions: List[Dict[str, Any]], complexity_scores: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Shared by detect_issues and analyze_and_score so both report issues in
+    # the same order: per function, then long / complex / too many params
+    num_scores = len(complexity_scores)
     issues = []
     
     for i, func in enumerate(functions):
-        func_name = func["name"]
-        num_lines = func["num_lines"]
+        if func["num_lines"] > 50:
+            issues.append(_long_function_issue(func))
         
-        # Issue: Function too long
-        if num_lines > 50:
-            issues.append({
-                "type": "long_function",
-                "function": func_name,
-                "severity": "medium",
-                "message": f"Function '{func_name}' is {num_lines} lines long (recommended: < 50)"
-            })
+        if i < num_scores and (complexity := complexity_scores[i]["complexity"]) > 10:
+            issues.append(_high_complexity_issue(func, complexity))
         
-        # Issue: High complexity
-        if i < len(complexity_scores):
-            complexity = complexity_scores[i]["complexity"]
-            if complexity > 10:
-                issues.append({
-                    "type": "high_complexity",
-                    "function": func_name,
-                    "severity": "high",
-                    "message": f"Function '{func_name}' has complexity {complexity} (recommended: < 10)"
-                })
-        
-        # Issue: Too many parameters
-        if len(func["args"]) > 5:
-            issues.append({
-                "type": "too_many_params",
-                "function": func_name,
-                "severity": "low",
-                "message": f"Function '{func_name}' has {len(func['args'])} parameters (recommended: < 5)"
-            })
-    
-    state.set("issues", issues)
-    state.set("issue_count", len(issues))
+        if (num_args := len(func["args"])) > 5:
+            issues.append(_too_many_params_issue(func, num_args))
+    
+    return issues
+
+
+def _suggest_for(issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"function": issue["function"], "suggestion": suggestion}
+        for issue in issues
+        if (suggestion := _SUGGESTION_BY_TYPE.get(issue["type"]))
+    ]
+
+
+@register_tool("detect_issues")
+def detect_issues(state: WorkflowState) -> WorkflowState:
+    issues = _find_issues(state.get("functions", []), state.get("complexity_scores", []))
+    
+    state.update({"issues": issues, "issue_count": len(issues)})
     
     return state
 
 
 @register_tool("suggest_improvements")
 def suggest_improvements(state: WorkflowState) -> WorkflowState:
-    issues = state.get("issues", [])
-    
-    suggestions = []
-    
-    for issue in issues:
-        if issue["type"] == "long_function":
-            suggestions.append({
-                "function": issue["function"],
-                "suggestion": "Consider breaking this function into smaller, more focused functions"
-            })
-        elif issue["type"] == "high_complexity":
-            suggestions.append({
-                "function": issue["function"],
-                "suggestion": "Reduce complexity by extracting conditional logic into separate functions"
-            })
-        elif issue["type"] == "too_many_params":
-            suggestions.append({
-                "function": issue["function"],
-                "suggestion": "Consider using a configuration object or dataclass to group related parameters"
-            })
-    
-    state.set("suggestions", suggestions)
+    state.set("suggestions", _suggest_for(state.get("issues", [])))
     
     return state
 
@@ -163,23 +299,28 @@ def suggest_improvements(state: WorkflowState) -> WorkflowState:
 def calculate_quality_score(state: WorkflowState) -> WorkflowState:
     issue_count = state.get("issue_count", 0)
     avg_complexity = state.get("avg_complexity", 0)
-    function_count = state.get("function_count", 1)
     
-    # Start with perfect score
-    score = 10.0
-    
-    # Deduct points for issues
-    score -= min(issue_count * 0.5, 5)  # Max 5 points deduction for issues
+    state.update({
+        "quality_score": _quality_score(issue_count, avg_complexity),
+        "iteration": state.get("iteration", 0) + 1
+    })
     
-    # Deduct points for high average complexity
-    if avg_complexity > 10:
-        score -= min((avg_complexity - 10) * 0.3, 3)  # Max 3 points for complexity
-    
-    # Ensure score is between 0 and 10
-    score = max(0, min(10, score))
+    return state
+
+
+@register_tool("analyze_and_score")
+def analyze_and_score(state: WorkflowState) -> WorkflowState:
+    # detect_issues + suggest_improvements + calculate_quality_score in one
+    # node, without intermediate state round-trips or extra log steps
+    issues = _find_issues(state.get("functions", []), state.get("complexity_scores", []))
     
-    state.set("quality_score", round(score, 2))
-    state.set("iteration", state.get("iteration", 0) + 1)
+    state.update({
+        "issues": issues,
+        "issue_count": len(issues),
+        "suggestions": _suggest_for(issues),
+        "quality_score": _quality_score(len(issues), state.get("avg_complexity", 0)),
+        "iteration": state.get("iteration", 0) + 1
+    })
     
     return state
 
@@ -199,27 +340,15 @@ def get_code_review_workflow_definition() -> Dict[str, Any]:
                 "function_name": "check_complexity",
                 "description": "Check code complexity"
             },
-            {
-                "name": "detect",
-                "function_name": "detect_issues",
-                "description": "Detect code quality issues"
-            },
-            {
-                "name": "suggest",
-                "function_name": "suggest_improvements",
-                "description": "Generate improvement suggestions"
-            },
             {
                 "name": "score",
-                "function_name": "calculate_quality_score",
-                "description": "Calculate quality score"
+                "function_name": "analyze_and_score",
+                "description": "Detect issues, suggest improvements and calculate quality score"
             }
         ],
         "edges": [
             {"from_node": "extract", "to_node": "analyze"},
-            {"from_node": "analyze", "to_node": "detect"},
-            {"from_node": "detect", "to_node": "suggest"},
-            {"from_node": "suggest", "to_node": "score"},
+            {"from_node": "analyze", "to_node": "score"},
             {
                 "from_node": "score",
                 "to_node": {
@@ -4,18 +4,75 @@ This demonstrates how to use the API programmatically.
 """
 import requests
 import json
+import orjson
 import time
 
 BASE_URL = "http://localhost:8000"
 
+# One session for every call, so the demo reuses a single keep-alive connection
+session = requests.Session()
+
+GRAPH_DATA = {
+    "name": "Code Review Mini-Agent",
+    "description": "Analyzes Python code and iteratively improves quality",
+    "nodes": [
+        {
+            "name": "extract",
+            "function_name": "extract_functions",
+            "description": "Extract function definitions from code"
+        },
+        {
+            "name": "analyze",
+            "function_name": "check_complexity",
+            "description": "Check code complexity"
+        },
+        {
+            "name": "detect",
+            "function_name": "detect_issues",
+            "description": "Detect code quality issues"
+        },
+        {
+            "name": "suggest",
+            "function_name": "suggest_improvements",
+            "description": "Generate improvement suggestions"
+        },
+        {
+            "name": "score",
+            "function_name": "calculate_quality_score",
+            "description": "Calculate quality score"
+        }
+    ],
+    "edges": [
+        {"from_node": "extract", "to_node": "analyze"},
+        {"from_node": "analyze", "to_node": "detect"},
+        {"from_node": "detect", "to_node": "suggest"},
+        {"from_node": "suggest", "to_node": "score"},
+        {
+            "from_node": "score",
+            "to_node": {
+                "condition_key": "quality_score",
+                "condition_operator": "<",
+                "condition_value": 7.0,
+                "true_node": "analyze",
+                "false_node": "END"
+            }
+        }
+    ],
+    "start_node": "extract"
+}
+
+# The graph definition never changes, so serialize it once at import
+_GRAPH_DATA_BYTES = json.dumps(GRAPH_DATA).encode()
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 def test_health():
     print("Testing health endpoint...")
 
-    response = requests.get(f"{BASE_URL}/health")
+    response = session.get(f"{BASE_URL}/health")
     
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}\n")
+    print(f"Response: {orjson.loads(response.content)}\n")
 
     return response.status_code == 200
 
@@ -23,58 +80,9 @@ def test_health():
 def create_code_review_graph():
     print("Creating Code Review workflow graph...")
     
-    graph_data = {
-        "name": "Code Review Mini-Agent",
-        "description": "Analyzes Python code and iteratively improves quality",
-        "nodes": [
-            {
-                "name": "extract",
-                "function_name": "extract_functions",
-                "description": "Extract function definitions from code"
-            },
-            {
-                "name": "analyze",
-                "function_name": "check_complexity",
-                "description": "Check code complexity"
-            },
-            {
-                "name": "detect",
-                "function_name": "detect_issues",
-                "description": "Detect code quality issues"
-            },
-            {
-                "name": "suggest",
-                "function_name": "suggest_improvements",
-                "description": "Generate improvement suggestions"
-            },
-            {
-                "name": "score",
-                "function_name": "calculate_quality_score",
-                "description": "Calculate quality score"
-            }
-        ],
-        "edges": [
-            {"from_node": "extract", "to_node": "analyze"},
-            {"from_node": "analyze", "to_node": "detect"},
-            {"from_node": "detect", "to_node": "suggest"},
-            {"from_node": "suggest", "to_node": "score"},
-            {
-                "from_node": "score",
-                "to_node": {
-                    "condition_key": "quality_score",
-                    "condition_operator": "<",
-                    "condition_value": 7.0,
-                    "true_node": "analyze",
-                    "false_node": "END"
-                }
-            }
-        ],
-        "start_node": "extract"
-    }
-    
-    response = requests.post(f"{BASE_URL}/graph/create", json=graph_data)
+    response = session.post(f"{BASE_URL}/graph/create", data=_GRAPH_DATA_BYTES, headers=_JSON_HEADERS)
     print(f"Status: {response.status_code}")
-    result = response.json()
+    result = orjson.loads(response.content)
     print(f"Response: {json.dumps(result, indent=2)}\n")
     
     return result.get("graph_id")
@@ -125,9 +133,9 @@ def another_long_function():
         }
     }
     
-    response = requests.post(f"{BASE_URL}/graph/run", json=run_data)
+    response = session.post(f"{BASE_URL}/graph/run", json=run_data)
     print(f"Status: {response.status_code}")
-    result = response.json()
+    result = orjson.loads(response.content)
     
     print(f"\n{'='*60}")
     print("EXECUTION RESULTS")
@@ -174,9 +182,9 @@ def get_run_state(run_id):
     """Get the state of a completed run."""
     print(f"Retrieving state for run: {run_id}...")
     
-    response = requests.get(f"{BASE_URL}/graph/state/{run_id}")
+    response = session.get(f"{BASE_URL}/graph/state/{run_id}")
     print(f"Status: {response.status_code}")
-    result = response.json()
+    result = orjson.loads(response.content)
     print(f"Run Status: {result.get('status')}\n")
     
     return result